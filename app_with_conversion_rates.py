@@ -1,10 +1,72 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import scipy.stats as stats
-import matplotlib.pyplot as plt
-import math
-import random
+
+from simulation import (
+    SCENARIO_PRESETS,
+    BehaviourParams,
+    SchemeParams,
+    StageProfiler,
+    analytic_summary,
+    bonus_split,
+    compare_scenarios,
+    evaluate_scheme,
+    load_retailer_economics,
+    preset_scenarios,
+    sample_population,
+    stage,
+    summary_metrics,
+)
+
+
+@st.cache_resource(max_entries=8)
+def cached_population(behaviour):
+    # Shared across reruns and sessions, so the arrays must not be mutated
+    return sample_population(behaviour)
+
+
+@st.cache_data(max_entries=64)
+def cached_estimate(behaviour, scheme, use_retailer_economics):
+    # Keyed on the checkbox rather than the table, which load_retailer_economics() caches itself
+    economics = load_retailer_economics() if use_retailer_economics else None
+    return analytic_summary(behaviour, scheme, economics)
+
+
+def format_pounds(value, decimals=0):
+    # Expectations can be infinite or undefined, e.g. a cost per acquisition with no referrals
+    return f"£{value:,.{decimals}f}" if np.isfinite(value) else "n/a"
+
+
+def render_histogram(values, title, xlabel, ylabel='Frequency'):
+    # matplotlib is only imported once a chart is actually drawn
+    import matplotlib.pyplot as plt
+
+    with stage("Charts"):
+        fig, ax = plt.subplots()
+        ax.hist(values, bins=30, edgecolor='black')
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        st.pyplot(fig)
+        plt.close(fig)
+
+
+def render_counts(df, column, title, xlabel):
+    import matplotlib.pyplot as plt
+
+    counts = df[column].value_counts().reset_index()
+    counts.columns = [column, "Count"]
+    counts = counts.sort_values(column)
+
+    with stage("Charts"):
+        fig, ax = plt.subplots()
+        ax.bar(counts[column], counts["Count"])
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel("Count")
+        st.pyplot(fig)
+        plt.close(fig)
+
 
 # Set the title of the app
 st.title("Subtv Loyality and Referral Scheme Simulation")
@@ -50,6 +112,14 @@ st.markdown("---")
 
 profit_margin = st.number_input("Average Profit Margin (%)", min_value=0.0, value=2.0, step=0.1)
 points_to_value_ratio = st.number_input('Points to Value Ration', min_value=0.001, value=0.001, step=0.001, format="%.3f")
+cash_out_threshold = st.number_input('Cash Out Threshold (Points)', min_value=1, value=10000, step=500)
+
+use_retailer_economics = st.checkbox("Use Retailer Economics (Ecom Modelling workbooks)")
+economics = load_retailer_economics() if use_retailer_economics else None
+if economics is not None:
+    with st.expander("Retailer Economics"):
+        st.write("Purchases are assigned to retailers by spend share. Retailers without a margin in the workbooks use the Average Profit Margin.")
+        st.dataframe(economics.to_frame().round(2))
 
 st.markdown("---")
 
@@ -98,268 +168,178 @@ with col2:
 st.markdown("---")
 
 st.header('Spin the Wheel Mechanism')
-spin_the_wheel_points = st.number_input('Points Per Sping the Wheel', min_value=0, value=2500, step=1)
+spin_the_wheel_points = st.number_input('Points Per Sping the Wheel', min_value=1, value=2500, step=1)
 avg_cost_spw = st.number_input('Average Cost Per Spin the Wheel (£)', min_value=0.0, value=0.50, step=0.01, format="%.2f")
 
+st.markdown("---")
 
+st.header('Scenario Comparison')
+compared_scenarios = st.multiselect('Compare the current scheme against', list(SCENARIO_PRESETS))
 
-# Button to run the simulation
-if st.button("Run Simulation"):
-    # Generate synthetic customer behavior
-    # purchases_per_customer = np.random.poisson(lam=average_purchases_per_customer, size=num_customers)
-    purchases_per_customer = np.random.negative_binomial(n=average_purchases_per_customer, p=0.5, size=num_customers)
-    order_values = np.random.normal(loc=average_order_value, scale=15, size=sum(purchases_per_customer))  
-    order_values = np.maximum(order_values, 5)  # Min purchase of £5
-    profit_margin = profit_margin / 100
-    # percentage_claimed = percentage_claimed / 100
-    requests_per_customer = np.random.lognormal(mean=2, sigma=1.2, size=num_customers).astype(int)
-    # Introduce a 50% chance of being zero
-    mask = np.random.choice([0, 1], size=num_customers, p=[0.5, 0.5])  # 50% chance for zero
-    requests_per_customer = requests_per_customer * mask
-    # request_points = number_requests * points_per_request
-
-    number_upvotes = np.random.lognormal(mean=1, sigma=0.4, size=sum(requests_per_customer)).astype(int) - 1
-    number_upvotes = np.maximum(number_upvotes, 0)
-    mask = np.random.choice([0, 1], size=len(number_upvotes), p=[0.5, 0.5])  # 50% chance for zero
-    number_upvotes = number_upvotes * mask
-    # number_upvotes = round(requests_per_customer * number_upvotes)
-    # upvote_points = number_upvotes * number_requests * points_per_upvote
-
-
-    referral_flags = np.round(stats.invgauss.rvs(mu=3 / 2, scale=2, size=num_customers)).astype(int) - 7
-
-    # Simulating the customer transactions
-    customer_data = []
-
-
-
-    for i in range(num_customers):
-        num_purchases = purchases_per_customer[i]
-        purchase_values = order_values[sum(purchases_per_customer[:i]):sum(purchases_per_customer[:i + 1])]
-
-        # Calculate points from purchases
-        purchase_points = np.sum(purchase_values) * point_per_spend
-
-        num_requests = requests_per_customer[i]
-        request_points = num_requests * points_per_request
-        num_upvotes = np.sum(number_upvotes[sum(requests_per_customer[:i]):sum(requests_per_customer[:i+1])])
-        upvote_points = num_upvotes * points_per_upvote
-            
-
-        # Check milestone points
-        milestone_points = 0
-        if num_purchases >= milestone1:
-            milestone_points += milestone1_value
-        if num_purchases >= milestone2:
-            milestone_points += milestone2_value
-        if num_purchases >= milestone3:
-            milestone_points += milestone3_value
-
-        # Referral points
-        num_referrals = min(max(referral_flags[i], 0), max_referrals)
-        referral_points = num_referrals * points_per_referral
-        # if referree:
-        #     referral_points = 2*referral_points
-
-        num_stw = (purchase_points + milestone_points + referral_points + request_points + upvote_points) / spin_the_wheel_points
-        stw_value = (math.floor(num_stw) * avg_cost_spw)
-
-        if assign_users_starting_points:
-
-            if random.random() < 0.4:
-                starting_points = 0
-            else:
-                starting_points = np.random.normal(loc=3000, scale=3000)  # You can adjust the std dev
-            if starting_points < 0:
-                starting_points = 0
-            elif starting_points > 10000:
-                cashed_out_times = math.floor(starting_points/10000)
-                starting_points = starting_points - cashed_out_times * 10000
-        else:
-            starting_points = 0
-
-
-
-        # Total points
-        total_points = starting_points + purchase_points + milestone_points + referral_points + request_points + upvote_points
-
-        total_points_claimed = math.floor(total_points / 10000) * 10000
-
-        rockbox_referral = np.random.random() < (app_users_rockbox / num_users)
-
-        # Store data
-        customer_data.append([i + 1, num_purchases, rockbox_referral, np.sum(purchase_values), purchase_points, milestone_points, num_referrals, referral_points, num_requests, request_points, num_upvotes, upvote_points, num_stw, stw_value, starting_points, total_points, total_points_claimed])
-
-
-
-    # Convert to DataFrame
-    df_customers = pd.DataFrame(customer_data, columns=[
-        "Customer_ID", "Purchases", 'Rockbox_Referral', "Total_Spend", "Purchase_Points",
-        "Milestone_Points", "Number_Referrals", "Referral_Points", "Number_Requests", "Request_Points", "Number_Upvotes", "Upvote_Points", "Number_Spin_The_Wheels", "Spin_The_Wheel_Value", "Starting_Points", "Total_Points", "Total_Points_Claimed"
-    ])
-
-
-    df_customers["Total_Points_Claimed_Value"] = df_customers.Total_Points_Claimed * points_to_value_ratio
-    # Calculate profit per customer
-    df_customers["Revenue"] = df_customers["Total_Spend"] * profit_margin 
-    df_customers["Rockbox Cut"] = np.where(df_customers["Rockbox_Referral"], df_customers["Revenue"] * 0.25, 0)
-    df_customers["Individual_Profit"] = df_customers["Revenue"] - df_customers["Total_Points_Claimed_Value"] - df_customers["Rockbox Cut"] - df_customers["Spin_The_Wheel_Value"]
-
-    # Round values
-    df_customers = df_customers.round(2)
-
-    # Create tabs for output
-    tab1, tab2, tab3 = st.tabs(["Summary", "Individual Profits","Distributions"])
-    # Summary Tab
-    with tab1:
-
-    # Display the table
-        st.write("### Individual Customer Data")
-        st.dataframe(df_customers)
-
-        # Show summary statistics
-        st.write("### Summary Statistics")
-        st.write(df_customers.describe())
-
-        # Show total profit      format(round(df_customers.Total_Points.sum()), ",")
-        # total_profit = df_customers["Individual_Profit"].sum()
-        # st.write(f"### **Total Estimated Profit: ${total_profit:,.2f}**")
-        st.write('## Simulation Summary')
-        st.write(f'### Total Giftcard Spend by Users: £{format(round(df_customers.Total_Spend.sum()), ",")}')
-        st.write(f'### Subtv Revenue: £{format(round(df_customers.Revenue.sum()), ",")}')
-        st.write(f'### Subtv Profit: £{format(round(df_customers.Individual_Profit.sum()), ",")}')
-        st.markdown("---")
-        st.write(f"""#### Total Giveaway From Points: {format(round(df_customers.Total_Points.sum()), ",")} Points or £{format(round(df_customers.Total_Points.sum() * points_to_value_ratio), ",")} of which £{format(round(df_customers.Total_Points_Claimed_Value.sum()), ",")} was claimed as giftcards.""")
-        st.write(f"#### Total Giveaway From Spin the Wheel: £{format(round(df_customers.Spin_The_Wheel_Value.sum()), ",")}")
-        st.write(f"""#### Number of Referrals: {format(df_customers.Number_Referrals.sum(), ",")}.""")
-        st.write(f"#### Cost per Aquisition from Referral/Loyality Scheme: £{format(round((df_customers.Total_Points_Claimed_Value.sum() + df_customers.Spin_The_Wheel_Value.sum())/df_customers.Number_Referrals.sum(), 2), ",")}")
-        st.markdown("---")
-        st.write(f'#### Rockbox Cut: £{format(round(df_customers['Rockbox Cut'].sum()), ",")}.')
-        st.write(f"""#### Number of Referrals: {format(df_customers.Rockbox_Referral.sum(), ",")}""")
-        st.write(f"#### Cost per Aquisition from Rockbox: £{round(df_customers["Rockbox Cut"].sum() / df_customers.Rockbox_Referral.sum(), 2)}")
-
-    # Distribution Tab
-    with tab2:
-        # Histogram of Individual Profit
-        st.write("### Histogram of Individual Profit")
-        fig, ax = plt.subplots()
-        ax.hist(df_customers['Individual_Profit'], bins=30, edgecolor='black')
-        ax.set_xlabel('Individual Profit')
-        ax.set_ylabel('Frequency')
-        ax.set_title('Histogram of Individual Profit')
-        st.pyplot(fig)
-
-        st.write('### Customers who we lose money on')
-        st.dataframe(df_customers[df_customers.Individual_Profit < 0])
-        st.write(df_customers[df_customers.Individual_Profit < 0].describe())
+st.markdown("---")
 
+seed = st.number_input('Random Seed', min_value=0, value=42, step=1)
 
-        st.write('### Bonus Split')
+with st.expander("Profiling Options"):
+    trace_memory = st.checkbox("Track Peak Memory per Stage (tracemalloc)")
+    capture_cprofile = st.checkbox("Capture cProfile")
 
-        total_Purchase_Points = df_customers.Purchase_Points.sum()
-        total_Milestone_Points = df_customers.Milestone_Points.sum()
-        total_Referral_Points = df_customers.Referral_Points.sum()
-        total_Request_Points = df_customers.Request_Points.sum()
-        total_Upvote_Points = df_customers.Upvote_Points.sum()
-        # total_SpinTheWheel_Value = df_customers.Spin_The_Wheel_Value.sum()
-        total_Points_Giveaway = sum([total_Purchase_Points, total_Milestone_Points, total_Referral_Points, total_Request_Points, total_Upvote_Points])
-        
-        # Create a DataFrame for the points breakdown
-        points_breakdown = pd.DataFrame({
-            'Points From': ['Purchases', 'Milestones', 'Referrals', 'Requests', 'Upvotes'],
-            'Points': [total_Purchase_Points, total_Milestone_Points, total_Referral_Points, total_Request_Points, total_Upvote_Points],
-        })
+st.markdown("---")
 
-        # Calculate the value and percentage of points giveaway
-        points_breakdown['Value (£)'] = points_breakdown['Points'] * points_to_value_ratio
-        points_breakdown['Percentage of Points Giveaway'] = (100 * points_breakdown['Points'] / total_Points_Giveaway).apply(lambda x: f"{x:.1f}%")
+behaviour = BehaviourParams(
+    num_customers=int(num_customers),
+    average_purchases_per_customer=average_purchases_per_customer,
+    average_order_value=average_order_value,
+    rockbox_share=app_users_rockbox / num_users if num_users else 0.0,
+    seed=int(seed),
+)
+scheme = SchemeParams(
+    profit_margin=profit_margin,
+    points_to_value_ratio=points_to_value_ratio,
+    points_per_referral=points_per_referral,
+    max_referrals=max_referrals,
+    point_per_spend=point_per_spend,
+    points_per_request=points_per_request,
+    points_per_upvote=points_per_upvote,
+    milestone1=milestone1,
+    milestone2=milestone2,
+    milestone3=milestone3,
+    milestone1_value=milestone1_value,
+    milestone2_value=milestone2_value,
+    milestone3_value=milestone3_value,
+    spin_the_wheel_points=spin_the_wheel_points,
+    avg_cost_spw=avg_cost_spw,
+    assign_users_starting_points=assign_users_starting_points,
+    cash_out_threshold=cash_out_threshold,
+)
+
+# Expected values straight from the inputs, shown before any simulation is run
+st.header("Instant Estimate")
+estimate = cached_estimate(behaviour, scheme, use_retailer_economics)
+estimate_col1, estimate_col2, estimate_col3, estimate_col4 = st.columns(4)
+estimate_col1.metric("Expected Revenue", format_pounds(estimate['Revenue']))
+estimate_col2.metric("Expected Profit", format_pounds(estimate['Profit']))
+estimate_col3.metric("Expected Giveaway Claimed", format_pounds(estimate['Total_Points_Claimed_Value'] + estimate['Spin_The_Wheel_Value']))
+estimate_col4.metric("Expected Cost per Aquisition", format_pounds(estimate['Cost_Per_Acquisition'], 2))
+st.caption("Analytic expectation from the inputs. Run the simulation for the full Monte Carlo distribution.")
 
-        # Display the DataFrame
-        st.dataframe(points_breakdown.round(2).sort_values('Points', ascending=False).reset_index(drop=True))
+# Button to run the simulation
+if st.button("Run Simulation"):
+    # Stopped even if a stage raises, so tracemalloc never keeps tracing the server process
+    with StageProfiler(trace_memory=trace_memory, cprofile=capture_cprofile) as profiler:
+        # Generate synthetic customer behavior, then apply the scheme rules to it
+        with stage("Population (cached)"):
+            population = cached_population(behaviour)
+        order_values = population.order_values
+        df_customers = evaluate_scheme(population, scheme, economics)
+
+        # Create tabs for output
+        tab1, tab2, tab3, tab4 = st.tabs(["Summary", "Individual Profits","Distributions", "Scenario Comparison"])
+        # Summary Tab
+        with tab1, stage("Summary tab"):
+
+        # Display the table
+            st.write("### Individual Customer Data")
+            st.dataframe(df_customers)
+
+            # Show summary statistics
+            st.write("### Summary Statistics")
+            with stage("describe()"):
+                st.write(df_customers.describe())
+
+            summary = summary_metrics(df_customers, points_to_value_ratio)
+            st.write('## Simulation Summary')
+            st.write(f"### Total Giftcard Spend by Users: £{round(summary['Total_Spend']):,}")
+            st.write(f"### Subtv Revenue: £{round(summary['Revenue']):,}")
+            st.write(f"### Subtv Profit: £{round(summary['Profit']):,}")
+            st.markdown("---")
+            st.write(f"""#### Total Giveaway From Points: {round(summary['Total_Points']):,} Points or £{round(summary['Total_Points_Value']):,} of which £{round(summary['Total_Points_Claimed_Value']):,} was claimed as giftcards.""")
+            st.write(f"#### Total Giveaway From Spin the Wheel: £{round(summary['Spin_The_Wheel_Value']):,}")
+            st.write(f"""#### Number of Referrals: {summary['Number_Referrals']:,}.""")
+            st.write(f"#### Cost per Aquisition from Referral/Loyality Scheme: £{round(summary['Cost_Per_Acquisition'], 2):,}")
+            st.markdown("---")
+            st.write(f"#### Rockbox Cut: £{round(summary['Rockbox_Cut']):,}.")
+            st.write(f"""#### Number of Referrals: {summary['Rockbox_Referrals']:,}""")
+            st.write(f"#### Cost per Aquisition from Rockbox: £{round(summary['Rockbox_Cost_Per_Acquisition'], 2)}")
+            st.markdown("---")
+
+            # The analytic estimate doubles as a check on the simulator
+            st.write('### Monte Carlo vs Analytic Estimate')
+            estimate_check = pd.DataFrame({"Monte Carlo": summary, "Analytic": estimate})
+            monte_carlo, analytic = estimate_check["Monte Carlo"].round(2), estimate_check["Analytic"].round(2)
+            # Undefined where the expectation is zero or infinite (e.g. no referrals allowed, no Rockbox reach)
+            comparable = analytic.where(np.isfinite(analytic) & (analytic != 0))
+            estimate_check["Difference (%)"] = np.where(monte_carlo == analytic, 0.0, 100 * (monte_carlo / comparable - 1))
+            st.dataframe(estimate_check.round(2))
+
+        # Distribution Tab
+        with tab2, stage("Individual Profits tab"):
+            # Histogram of Individual Profit
+            st.write("### Histogram of Individual Profit")
+            render_histogram(df_customers['Individual_Profit'], 'Histogram of Individual Profit', 'Individual Profit')
+
+            st.write('### Customers who we lose money on')
+            st.dataframe(df_customers[df_customers.Individual_Profit < 0])
+            st.write(df_customers[df_customers.Individual_Profit < 0].describe())
+
+
+            st.write('### Bonus Split')
+            st.dataframe(bonus_split(df_customers, points_to_value_ratio))
 
 
     
-    with tab3:
-        # Average Purchases
-        st.write("### Purchases")
-        avg_purchases = round(df_customers.Purchases.mean(), 1)
-        st.write(f"Average Purchases: **{avg_purchases}**")
-
-        purchase_counts = df_customers.Purchases.value_counts().reset_index()
-        purchase_counts.columns = ["Purchases", "Count"]
-        purchase_counts = purchase_counts.sort_values("Purchases")
-
-        fig, ax = plt.subplots()
-        ax.bar(purchase_counts["Purchases"], purchase_counts["Count"])
-        ax.set_title("Purchases Distribution")
-        ax.set_xlabel("Purchases")
-        ax.set_ylabel("Count")
-        st.pyplot(fig)
-
-        # Order Value
-        st.write("### Order Values")
-        # Calculate and display the average order value
-        avg_order_value_simulated = round(np.mean(order_values), 2)
-        st.write(f"Average Order Value: **£{avg_order_value_simulated}**")
-
-        # Plot the distribution of order values
-        fig, ax = plt.subplots()
-        ax.hist(order_values, bins=30, edgecolor='black')
-        ax.set_xlabel("Order Value (£)")
-        ax.set_ylabel("Frequency")
-        ax.set_title("Distribution of Order Values")
-        st.pyplot(fig)
-
-
-        # Referrers Distribution
-        st.write("### Referrals")
-        zero_referrals_pct = round(100 * (len(df_customers[df_customers.Number_Referrals == 0]) / len(df_customers)), 1)
-        st.write(f"Percentage of Users who make zero referrals: **{zero_referrals_pct}%**")
-
-
-        referrers_count = df_customers[df_customers.Number_Referrals > 0]['Number_Referrals'].value_counts().reset_index()
-        referrers_count.columns = ["Number_Referrals", "Count"]
-        referrers_count = referrers_count.sort_values("Number_Referrals")
-
-        fig, ax = plt.subplots()
-        ax.bar(referrers_count["Number_Referrals"], referrers_count["Count"])
-        ax.set_title("Referrers Distribution")
-        ax.set_xlabel("Referrals")
-        ax.set_ylabel("Count")
-        st.pyplot(fig)
-
-        # Requests Distribution
-        st.write("### Requests")
-        zero_Requests_pct = round(100 * (len(df_customers[df_customers.Number_Requests == 0]) / len(df_customers)), 1)
-        st.write(f"Percentage of Users who make zero requests: **{zero_Requests_pct}%**")
-
-
-        referrers_count = df_customers[df_customers.Number_Requests != 0]['Number_Requests'].value_counts().reset_index()
-        referrers_count.columns = ["Number_Requests", "Count"]
-        referrers_count = referrers_count.sort_values("Number_Requests")
-
-        fig, ax = plt.subplots()
-        ax.bar(referrers_count["Number_Requests"], referrers_count["Count"])
-        ax.set_title("Requests Distribution")
-        ax.set_xlabel("Requests")
-        ax.set_ylabel("Count")
-        st.pyplot(fig)
-
-
-        # UPVOTES Distribution
-        st.write("### Upvotes")
-        zero_Upvotes_pct = round(100 * (len(df_customers[df_customers.Number_Upvotes == 0]) / len(df_customers)), 1)
-        st.write(f"Percentage of Users who have zero Upvotes: **{zero_Upvotes_pct}%**")
-
-
-        referrers_count = df_customers[df_customers.Number_Upvotes != 0]['Number_Upvotes'].value_counts().reset_index()
-        referrers_count.columns = ["Number_Upvotes", "Count"]
-        referrers_count = referrers_count.sort_values("Number_Upvotes")
-
-        fig, ax = plt.subplots()
-        ax.bar(referrers_count["Number_Upvotes"], referrers_count["Count"])
-        ax.set_title("Upvotes Distribution")
-        ax.set_xlabel("Upvotes")
-        ax.set_ylabel("Count")
-        st.pyplot(fig)
-        
+        with tab3, stage("Distributions tab"):
+            # Average Purchases
+            st.write("### Purchases")
+            avg_purchases = round(df_customers.Purchases.mean(), 1)
+            st.write(f"Average Purchases: **{avg_purchases}**")
+            render_counts(df_customers, "Purchases", "Purchases Distribution", "Purchases")
+
+            # Order Value
+            st.write("### Order Values")
+            # Calculate and display the average order value
+            avg_order_value_simulated = round(np.mean(order_values), 2)
+            st.write(f"Average Order Value: **£{avg_order_value_simulated}**")
+
+            # Plot the distribution of order values
+            render_histogram(order_values, "Distribution of Order Values", "Order Value (£)")
+
+
+            # Referrers Distribution
+            st.write("### Referrals")
+            zero_referrals_pct = round(100 * (len(df_customers[df_customers.Number_Referrals == 0]) / len(df_customers)), 1)
+            st.write(f"Percentage of Users who make zero referrals: **{zero_referrals_pct}%**")
+            render_counts(df_customers[df_customers.Number_Referrals > 0], "Number_Referrals", "Referrers Distribution", "Referrals")
+
+            # Requests Distribution
+            st.write("### Requests")
+            zero_Requests_pct = round(100 * (len(df_customers[df_customers.Number_Requests == 0]) / len(df_customers)), 1)
+            st.write(f"Percentage of Users who make zero requests: **{zero_Requests_pct}%**")
+            render_counts(df_customers[df_customers.Number_Requests != 0], "Number_Requests", "Requests Distribution", "Requests")
+
+
+            # UPVOTES Distribution
+            st.write("### Upvotes")
+            zero_Upvotes_pct = round(100 * (len(df_customers[df_customers.Number_Upvotes == 0]) / len(df_customers)), 1)
+            st.write(f"Percentage of Users who have zero Upvotes: **{zero_Upvotes_pct}%**")
+            render_counts(df_customers[df_customers.Number_Upvotes != 0], "Number_Upvotes", "Upvotes Distribution", "Upvotes")
+
+        with tab4, stage("Scenario Comparison tab"):
+            # Every scenario is evaluated against the same cached population; the current scheme's table is reused
+            scenario_summary, scenario_split = compare_scenarios(
+                population, preset_scenarios(scheme, compared_scenarios), economics, evaluated={"Current Scheme": df_customers},
+            )
+
+            st.write('### Summary')
+            st.dataframe(scenario_summary.round(2))
+
+            st.write('### Bonus Split (Points)')
+            st.dataframe(scenario_split.round(2))
+
+    with st.expander("Performance"):
+        report = profiler.report()
+        st.write(f"Total run time: **{report['total_seconds']:.3f}s**")
+        st.dataframe(pd.DataFrame(report["stages"]).round(4))
+        if report["cprofile"]:
+            st.code(report["cprofile"])
+        st.download_button("Download Profile (JSON)", profiler.to_json(), file_name="simulation_profile.json", mime="application/json")
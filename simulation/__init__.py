@@ -0,0 +1,33 @@
+from simulation.analytic import analytic_summary
+from simulation.compare import SCENARIO_PRESETS, compare_scenarios, preset_scenarios
+from simulation.economics import RetailerEconomics, load_retailer_economics
+from simulation.kernels import NUMBA_AVAILABLE, RuleSet, apply_rules
+from simulation.params import BehaviourParams, SchemeParams
+from simulation.population import Population, referral_distribution, sample_population
+from simulation.profiling import StageProfiler, stage
+from simulation.scheme import CUSTOMER_COLUMNS, evaluate_scheme, scheme_totals
+from simulation.summary import bonus_split, summary_metrics
+
+__all__ = [
+    "BehaviourParams",
+    "SchemeParams",
+    "Population",
+    "referral_distribution",
+    "sample_population",
+    "StageProfiler",
+    "stage",
+    "CUSTOMER_COLUMNS",
+    "evaluate_scheme",
+    "scheme_totals",
+    "analytic_summary",
+    "bonus_split",
+    "summary_metrics",
+    "RetailerEconomics",
+    "load_retailer_economics",
+    "NUMBA_AVAILABLE",
+    "RuleSet",
+    "apply_rules",
+    "SCENARIO_PRESETS",
+    "compare_scenarios",
+    "preset_scenarios",
+]
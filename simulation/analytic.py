@@ -0,0 +1,226 @@
+"""Closed-form and cheap semi-analytic expectations of the Monte Carlo summary metrics.
+
+Everything that is linear in the sampled behaviour (spend, revenue, points earned,
+referrals) is an exact expectation. The cash-out and spin the wheel payouts involve a
+floor, so they need the distribution of a customer's points: each component (purchases
+with milestones, referrals, requests with upvotes, starting balance) is discretised on
+a common points grid and the components are convolved with an FFT.
+
+The estimate is shown as soon as the dashboard loads, so it only needs scipy.special:
+importing scipy.stats or scipy.signal would cost more than the estimate itself.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from simulation import population as model
+from simulation.economics import RetailerEconomics
+from simulation.params import BehaviourParams, SchemeParams
+from simulation.scheme import ROCKBOX_CUT
+
+GRID_POINTS = 4096
+REQUEST_NODES = 64
+_TAIL = 1e-9
+
+
+def _normal_pdf(x, mean=0.0, sd=1.0):
+    z = (x - mean) / sd
+    return np.exp(-z**2 / 2) / (sd * np.sqrt(2 * np.pi))
+
+
+def _lognormal_cdf(x, mean, sigma):
+    from scipy.special import ndtr
+
+    with np.errstate(divide="ignore"):
+        return ndtr((np.log(x) - mean) / sigma)
+
+
+def _nbinom_pmf(n, p):
+    """pmf of the number of failures before ``n`` successes, up to a negligible tail."""
+    from scipy.special import gammaln
+
+    mean, sd = n * (1 - p) / p, np.sqrt(n * (1 - p)) / p
+    k = np.arange(0, int(mean + 20 * sd) + 50)
+    pmf = np.exp(gammaln(k + n) - gammaln(n) - gammaln(k + 1) + n * np.log(p) + k * np.log1p(-p))
+    support = np.searchsorted(np.cumsum(pmf), 1 - _TAIL) + 1
+    return k[:support], pmf[:support] / pmf[:support].sum()
+
+
+def _invgauss_sf(x, mu, scale):
+    """P(X > x) for scipy's invgauss(mu, scale=scale)."""
+    from scipy.special import ndtr
+
+    y = np.asarray(x, dtype=float) / scale
+    root = 1 / np.sqrt(y)
+    return ndtr(-root * (y / mu - 1)) - np.exp(2 / mu) * ndtr(-root * (y / mu + 1))
+
+
+def _clipped_normal_moments(mean, sd, low):
+    """First two moments of max(X, low) for X ~ Normal(mean, sd)."""
+    from scipy.special import ndtr
+
+    z = (low - mean) / sd
+    below, density = ndtr(z), _normal_pdf(z)
+    first = low * below + mean * (1 - below) + sd * density
+    second = low**2 * below + (mean**2 + sd**2) * (1 - below) + sd * (mean + low) * density
+    return first, second
+
+
+@lru_cache(maxsize=None)
+def _floored_lognormal_pmf(mean, sigma, offset=0, active=1.0):
+    """pmf of B * max(floor(L) - offset, 0), L ~ LogNormal(mean, sigma), B ~ Bernoulli(active)."""
+    from scipy.special import ndtri
+
+    values = np.arange(0, int(np.exp(mean + sigma * ndtri(1 - _TAIL))) + 2)
+    cdf = _lognormal_cdf(values + offset + 1.0, mean, sigma)
+    pmf = active * np.diff(cdf, prepend=0.0)
+    pmf[0] += 1 - active
+    return values, pmf / pmf.sum()
+
+
+def _mixture_on_grid(means, sds, weights, step, size):
+    """Probability mass per grid cell of a weighted mixture of normals, clipped to the grid."""
+    from scipy.special import ndtr
+
+    edges = step * (np.arange(size + 1) - 0.5)
+    edges[0], edges[-1] = -np.inf, np.inf
+    cdf = ndtr((edges[None, :] - means[:, None]) / np.maximum(sds, 1e-9)[:, None])
+    return weights @ np.diff(cdf, axis=1)
+
+
+def _lumps_on_grid(values, weights, step, size):
+    cells = np.minimum(np.rint(np.asarray(values) / step).astype(int), size - 1)
+    return np.bincount(cells, weights=weights, minlength=size)
+
+
+def _convolve(*pmfs):
+    result = pmfs[0]
+    for pmf in pmfs[1:]:
+        size = len(result) + len(pmf) - 1
+        fft_size = 1 << (size - 1).bit_length()
+        product = np.fft.rfft(result, fft_size) * np.fft.rfft(pmf, fft_size)
+        result = np.maximum(np.fft.irfft(product, fft_size)[:size], 0)
+    return result / result.sum()
+
+
+def _expected_floor(pmf, step, unit, mean):
+    """E[floor(T / unit)] for T with mass ``pmf`` at multiples of ``step``."""
+    if unit <= 0:
+        return np.inf
+    if unit < 20 * step:
+        # The grid cannot resolve the unit; T is spread over many units, so floor loses half a unit on average
+        return max(mean / unit - 0.5, 0.0)
+    return float(pmf @ np.floor(step * np.arange(len(pmf)) / unit + 1e-9))
+
+
+def analytic_summary(behaviour: BehaviourParams, scheme: SchemeParams, economics: RetailerEconomics = None) -> dict:
+    """Expected values of the summary_metrics() keys, computed from the inputs alone."""
+    num_customers = behaviour.num_customers
+
+    # Purchases: negative binomial, evaluated over its support up to a negligible tail
+    purchases, purchases_pmf = _nbinom_pmf(behaviour.average_purchases_per_customer, model.PURCHASE_SUCCESS_PROBABILITY)
+
+    order_mean, order_second = _clipped_normal_moments(behaviour.average_order_value, model.ORDER_VALUE_SD, model.MIN_ORDER_VALUE)
+    order_sd = np.sqrt(order_second - order_mean**2)
+    spend = purchases @ purchases_pmf * order_mean
+
+    # Milestones: P(N >= threshold) for each tier, from the negative binomial
+    milestone_tiers = [
+        (scheme.milestone1, scheme.milestone1_value),
+        (scheme.milestone2, scheme.milestone2_value),
+        (scheme.milestone3, scheme.milestone3_value),
+    ]
+    milestone_by_purchases = sum(value * (purchases >= threshold) for threshold, value in milestone_tiers)
+    purchase_points_mean = purchases * order_mean * scheme.point_per_spend + milestone_by_purchases
+    purchase_points_sd = np.sqrt(purchases) * order_sd * scheme.point_per_spend
+
+    # Referrals: round(invgauss) - offset clipped to [0, cap], so P(referrals >= r) = P(Y >= r + offset - 0.5)
+    referrals = np.arange(0, scheme.max_referrals + 1)
+    at_least = np.append(_invgauss_sf(referrals[1:] + model.REFERRAL_OFFSET - 0.5, *model.REFERRAL_INVGAUSS), 0.0)
+    referrals_pmf = np.append(1.0, at_least[:-1]) - at_least
+    expected_referrals = at_least[:-1].sum()
+
+    # Requests are heavy tailed, so keep their distribution (binned into nodes); the upvotes
+    # summed over a customer's requests are close to normal given the number of requests
+    requests, requests_pmf = _floored_lognormal_pmf(*model.REQUESTS_LOGNORMAL, active=model.ACTIVE_PROBABILITY)
+    upvotes, upvotes_pmf = _floored_lognormal_pmf(*model.UPVOTES_LOGNORMAL, offset=1, active=model.ACTIVE_PROBABILITY)
+    upvotes_mean = upvotes @ upvotes_pmf
+    upvotes_var = (upvotes**2) @ upvotes_pmf - upvotes_mean**2
+    nodes = np.minimum((np.cumsum(requests_pmf) * REQUEST_NODES).astype(int), REQUEST_NODES - 1)
+    node_weight = np.bincount(nodes, weights=requests_pmf)
+    used = node_weight > 0
+    node_weight = node_weight[used]
+    node_requests = np.bincount(nodes, weights=requests_pmf * requests)[used] / node_weight
+    node_requests_var = np.bincount(nodes, weights=requests_pmf * requests**2)[used] / node_weight - node_requests**2
+    per_request = scheme.points_per_request + scheme.points_per_upvote * upvotes_mean
+    activity_mean = node_requests * per_request
+    activity_sd = np.sqrt(np.maximum(node_requests_var, 0) * per_request**2 + node_requests * upvotes_var * scheme.points_per_upvote**2)
+    expected_activity = requests @ requests_pmf * per_request
+
+    expected_earned = (
+        purchases_pmf @ purchase_points_mean
+        + expected_referrals * scheme.points_per_referral
+        + expected_activity
+    )
+
+    # Starting balance: zero, or a normal clipped at zero and cashed out below the threshold
+    start_mean, start_sd = model.STARTING_POINTS_MEAN, model.STARTING_POINTS_SD
+    start_top = model.STARTING_POINTS_CASH_OUT
+
+    # Common grid for every component, wide enough for the largest total
+    top = (
+        (purchase_points_mean + 8 * purchase_points_sd).max()
+        + scheme.max_referrals * scheme.points_per_referral
+        + (activity_mean + 8 * activity_sd).max()
+        + (start_top if scheme.assign_users_starting_points else 0)
+    )
+    step = max(top, 1.0) / GRID_POINTS
+
+    earned_pmf = _convolve(
+        _mixture_on_grid(purchase_points_mean, purchase_points_sd, purchases_pmf, step, GRID_POINTS),
+        _lumps_on_grid(referrals * scheme.points_per_referral, referrals_pmf, step, GRID_POINTS),
+        _mixture_on_grid(activity_mean, activity_sd, node_weight, step, GRID_POINTS),
+    )
+
+    if scheme.assign_users_starting_points:
+        x = step * np.arange(int(np.ceil(start_top / step)) + 1)
+        wrapped = sum(_normal_pdf(x + k * start_top, start_mean, start_sd) for k in range(1, 8))
+        density = wrapped * (x > 0) + _normal_pdf(x, start_mean, start_sd)
+        start_pmf = (1 - model.ZERO_START_PROBABILITY) * density * step
+        start_pmf[0] += 1 - start_pmf.sum()
+        expected_starting = start_pmf @ x
+        total_pmf = _convolve(earned_pmf, start_pmf)
+    else:
+        expected_starting = 0.0
+        total_pmf = earned_pmf
+
+    total_points = expected_earned + expected_starting
+    claimed_points = scheme.cash_out_threshold * _expected_floor(total_pmf, step, scheme.cash_out_threshold, total_points)
+    spins = _expected_floor(earned_pmf, step, scheme.spin_the_wheel_points, expected_earned)
+
+    # Revenue is linear in spend, so a retailer mix only changes the average rate
+    if economics is None:
+        revenue_rate = scheme.profit_margin / 100
+    else:
+        revenue_rate = (economics.spend_share * economics.revenue_rates(scheme.profit_margin)).sum()
+    revenue = spend * revenue_rate
+
+    claimed_value = claimed_points * scheme.points_to_value_ratio
+    stw_value = spins * scheme.avg_cost_spw
+    rockbox_cut = ROCKBOX_CUT * revenue * behaviour.rockbox_share
+
+    # Same keys and order as summary_metrics(), so the two line up side by side
+    return {
+        "Total_Spend": num_customers * spend,
+        "Revenue": num_customers * revenue,
+        "Profit": num_customers * (revenue - claimed_value - rockbox_cut - stw_value),
+        "Total_Points": num_customers * total_points,
+        "Total_Points_Value": num_customers * total_points * scheme.points_to_value_ratio,
+        "Total_Points_Claimed_Value": num_customers * claimed_value,
+        "Spin_The_Wheel_Value": num_customers * stw_value,
+        "Number_Referrals": num_customers * expected_referrals,
+        "Cost_Per_Acquisition": (claimed_value + stw_value) / expected_referrals if expected_referrals else float("nan"),
+        "Rockbox_Cut": num_customers * rockbox_cut,
+        "Rockbox_Referrals": num_customers * behaviour.rockbox_share,
+        "Rockbox_Cost_Per_Acquisition": ROCKBOX_CUT * revenue if behaviour.rockbox_share else float("nan"),
+    }
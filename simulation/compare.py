@@ -0,0 +1,54 @@
+from dataclasses import replace
+
+import pandas as pd
+
+from simulation.params import SchemeParams
+from simulation.population import Population
+from simulation.scheme import scheme_totals
+from simulation.summary import bonus_split, summary_metrics
+
+# Variants of a base scheme that the old per-variant apps used to cover
+SCENARIO_PRESETS = {
+    "No Spin the Wheel": {"avg_cost_spw": 0.0},
+    "With Starting Points": {"assign_users_starting_points": True},
+    "Without Starting Points": {"assign_users_starting_points": False},
+    "£-Value Rewards (No Cash-Out Threshold)": {"cash_out_threshold": 1},
+    "No Milestones": {"milestone1_value": 0, "milestone2_value": 0, "milestone3_value": 0},
+}
+
+
+def preset_scenarios(base: SchemeParams, names) -> dict:
+    """Build named scenarios from the base scheme, starting with the base itself.
+
+    A preset that leaves the base unchanged (e.g. "With Starting Points" when the base
+    already assigns them) is skipped rather than repeating the Current Scheme column.
+    """
+    scenarios = {"Current Scheme": base}
+    for name in names:
+        scheme = replace(base, **SCENARIO_PRESETS[name])
+        if scheme != base:
+            scenarios[name] = scheme
+    return scenarios
+
+
+def compare_scenarios(population: Population, scenarios: dict, economics=None, evaluated=None) -> tuple:
+    """Evaluate every scenario against the same population.
+
+    Sharing the population means every scenario sees the same sampled customers
+    (common random numbers), so differences between columns come from the rules alone.
+    ``evaluated`` maps scenario names to per-customer tables that already exist, such as
+    the current scheme's, so they are not evaluated again; the other scenarios are reduced
+    to column totals without building their tables.
+    Returns the summary metrics and the bonus split with one column per scenario.
+    """
+    evaluated = evaluated or {}
+    summaries = {}
+    splits = {}
+    for name, scheme in scenarios.items():
+        df_customers = evaluated.get(name)
+        if df_customers is None:
+            df_customers = scheme_totals(population, scheme, economics)
+        summaries[name] = summary_metrics(df_customers, scheme.points_to_value_ratio)
+        splits[name] = bonus_split(df_customers, scheme.points_to_value_ratio).set_index('Points From')['Points']
+
+    return pd.DataFrame(summaries), pd.DataFrame(splits)
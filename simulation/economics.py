@@ -0,0 +1,159 @@
+"""Per-retailer economics read from the "Ecom Modelling <Retailer>.xlsx" workbooks.
+
+Parsing the workbooks needs openpyxl and is slow, so the result is written to a small
+columnar .npz cache next to the workbooks and only rebuilt when a workbook changes.
+"""
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from glob import glob
+
+import numpy as np
+
+WORKBOOK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOK_PREFIX = "Ecom Modelling "
+CACHE_NAME = ".retailer_economics.npz"
+
+# The workbooks assume roughly 50 brands on the gift card platform, 2% of spend each
+DEFAULT_BRAND_SHARE = 0.02
+
+
+@dataclass(frozen=True)
+class RetailerEconomics:
+    """One row per retailer; the last row, "Other", takes any spend not otherwise assigned.
+
+    A NaN margin means the workbooks have no figure for that retailer and the scheme's
+    profit margin is used instead.
+    """
+
+    names: np.ndarray
+    spend_share: np.ndarray
+    margin: np.ndarray  # percent of spend
+    commission: np.ndarray  # percent of revenue paid away
+
+    def assign(self, draws):
+        """Map uniform draws in [0, 1) onto retailer indices in proportion to spend share."""
+        return np.minimum(np.searchsorted(np.cumsum(self.spend_share), draws, side="right"), len(self.names) - 1)
+
+    def revenue_rates(self, default_margin):
+        """Revenue per £ of spend for each retailer."""
+        margin = np.where(np.isnan(self.margin), default_margin, self.margin)
+        return margin / 100 * (1 - self.commission / 100)
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({
+            "Retailer": self.names,
+            "Spend Share (%)": 100 * self.spend_share,
+            "Margin (%)": self.margin,
+            "Commission (%)": self.commission,
+        })
+
+
+def _labelled_values(sheet, case):
+    # Label/value blocks: a "Column1" header above the labels, the case name above the values
+    values = {}
+    header = sheet.iloc[0].tolist()
+    for label_col, cell in enumerate(header):
+        if cell != "Column1" or case not in header[label_col:]:
+            continue
+        value_col = header.index(case, label_col)
+        for label, value in zip(sheet.iloc[1:, label_col], sheet.iloc[1:, value_col]):
+            if isinstance(label, str) and label.strip() not in values:
+                values[label.strip()] = value
+    return values
+
+
+def _brand_discounts(sheet):
+    discounts = {}
+    for row, col in zip(*np.nonzero(sheet.map(lambda cell: cell == "Brand").to_numpy())):
+        for brand, discount in zip(sheet.iloc[row + 1:, col], sheet.iloc[row + 1:, col + 1]):
+            if not isinstance(brand, str):
+                break
+            discounts[brand.strip()] = float(discount)
+    return discounts
+
+
+def _read_workbooks(paths, case):
+    import pandas as pd
+
+    names, shares, margins = [], [], []
+    for path in paths:
+        retailer = os.path.basename(path)[len(WORKBOOK_PREFIX):-len(".xlsx")]
+        sheet = pd.read_excel(path, header=None)
+        values = _labelled_values(sheet, case)
+
+        category_share = next((float(value) for label, value in values.items() if label.startswith("Percentage Spend on")), 1.0)
+        market_share = values.get(f"{retailer} Market Share on Subtv", values.get(f"{retailer} Market Share (Real World)"))
+        if market_share is not None:
+            names.append(retailer)
+            shares.append(category_share * float(market_share))
+            margins.append(np.nan)
+
+        for brand, discount in _brand_discounts(sheet).items():
+            if brand not in names:
+                names.append(brand)
+                shares.append(DEFAULT_BRAND_SHARE)
+                margins.append(discount)
+
+    names.append("Other")
+    shares.append(max(0.0, 1 - sum(shares)))
+    margins.append(np.nan)
+
+    shares = np.array(shares)
+    return RetailerEconomics(
+        names=np.array(names),
+        spend_share=shares / shares.sum(),
+        margin=np.array(margins),
+        commission=np.zeros(len(names)),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_retailer_economics(directory=WORKBOOK_DIR, case="Likely") -> RetailerEconomics:
+    """Load the retailer table, from the .npz cache when it is newer than every workbook."""
+    paths = sorted(glob(os.path.join(directory, f"{WORKBOOK_PREFIX}*.xlsx")))
+    if not paths:
+        raise FileNotFoundError(f"no '{WORKBOOK_PREFIX}*.xlsx' workbooks in {directory}")
+
+    cache_path = os.path.join(directory, CACHE_NAME)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= max(map(os.path.getmtime, paths)):
+        with np.load(cache_path) as cached:
+            if str(cached["case"]) == case and list(cached["workbooks"]) == [os.path.basename(p) for p in paths]:
+                return RetailerEconomics(
+                    names=cached["names"],
+                    spend_share=cached["spend_share"],
+                    margin=cached["margin"],
+                    commission=cached["commission"],
+                )
+
+    economics = _read_workbooks(paths, case)
+    _save_cache(cache_path, case, paths, economics)
+    return economics
+
+
+def _save_cache(cache_path, case, paths, economics):
+    # Written to a temp file and renamed into place, so another process never reads a
+    # half-written cache; failing to write it (e.g. a read-only directory) is not an error
+    directory = os.path.dirname(cache_path)
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f"{CACHE_NAME}.", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as cache:
+            np.savez(
+                cache,
+                case=case,
+                workbooks=np.array([os.path.basename(p) for p in paths]),
+                names=economics.names,
+                spend_share=economics.spend_share,
+                margin=economics.margin,
+                commission=economics.commission,
+            )
+        os.chmod(temp_path, 0o644)  # mkstemp creates it private to this user
+        os.replace(temp_path, cache_path)
+    except OSError:
+        os.remove(temp_path)
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib.util import find_spec
+
+import numpy as np
+
+from simulation.params import SchemeParams
+
+# numba is optional: when it is installed the rules run through a compiled loop,
+# otherwise through the NumPy kernel below. Both give the same results.
+NUMBA_AVAILABLE = find_spec("numba") is not None
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Scheme rules declared as data so the kernels stay the same as tiers are added."""
+
+    milestone_thresholds: tuple  # sorted ascending
+    milestone_values: tuple
+    referral_cap: int
+    points_per_referral: float
+    wheel_points: float
+    cash_out_threshold: float
+
+    @classmethod
+    def from_scheme(cls, scheme: SchemeParams) -> "RuleSet":
+        tiers = sorted([
+            (scheme.milestone1, scheme.milestone1_value),
+            (scheme.milestone2, scheme.milestone2_value),
+            (scheme.milestone3, scheme.milestone3_value),
+        ])
+        return cls(
+            milestone_thresholds=tuple(threshold for threshold, _ in tiers),
+            milestone_values=tuple(value for _, value in tiers),
+            referral_cap=scheme.max_referrals,
+            points_per_referral=scheme.points_per_referral,
+            wheel_points=scheme.spin_the_wheel_points,
+            cash_out_threshold=scheme.cash_out_threshold,
+        )
+
+
+def _apply_rules_numpy(purchases, referral_flags, base_points, starting_points,
+                       thresholds, values, referral_cap, points_per_referral, wheel_points, cash_out_threshold):
+    # Number of tiers reached, then look up the cumulative value of those tiers
+    tiers_reached = np.searchsorted(thresholds, purchases, side="right")
+    milestone_points = np.concatenate(([0.0], np.cumsum(values)))[tiers_reached]
+
+    num_referrals = np.clip(referral_flags, 0, referral_cap)
+    referral_points = num_referrals * points_per_referral
+
+    earned_points = base_points + milestone_points + referral_points
+    num_stw = earned_points / wheel_points
+
+    total_points = starting_points + earned_points
+    total_points_claimed = np.floor(total_points / cash_out_threshold) * cash_out_threshold
+
+    return milestone_points, num_referrals, referral_points, num_stw, total_points, total_points_claimed
+
+
+@lru_cache(maxsize=None)
+def _jit_kernel():
+    # numba is imported and the kernel compiled on first use, not at import time
+    import numba
+
+    @numba.njit(cache=True, error_model="numpy")
+    def _apply_rules_jit(purchases, referral_flags, base_points, starting_points,
+                         thresholds, values, referral_cap, points_per_referral, wheel_points, cash_out_threshold):
+        n = purchases.shape[0]
+        milestone_points = np.empty(n)
+        num_referrals = np.empty(n, dtype=np.int64)
+        referral_points = np.empty(n)
+        num_stw = np.empty(n)
+        total_points = np.empty(n)
+        total_points_claimed = np.empty(n)
+
+        for i in range(n):
+            points = 0.0
+            for k in range(thresholds.shape[0]):
+                if purchases[i] < thresholds[k]:
+                    break
+                points += values[k]
+            milestone_points[i] = points
+
+            referrals = min(max(referral_flags[i], 0), referral_cap)
+            num_referrals[i] = referrals
+            referral_points[i] = referrals * points_per_referral
+
+            earned = base_points[i] + points + referral_points[i]
+            num_stw[i] = earned / wheel_points
+
+            total = starting_points[i] + earned
+            total_points[i] = total
+            total_points_claimed[i] = np.floor(total / cash_out_threshold) * cash_out_threshold
+
+        return milestone_points, num_referrals, referral_points, num_stw, total_points, total_points_claimed
+
+    return _apply_rules_jit
+
+
+def apply_rules(rules: RuleSet, purchases, referral_flags, base_points, starting_points, use_jit=None):
+    """Evaluate milestone tiers, referral caps, wheel conversions and cash-outs over whole arrays.
+
+    ``base_points`` are the points earned outside the rule set (purchases, requests, upvotes).
+    Returns milestone points, referrals, referral points, spins earned, total points and points claimed.
+    """
+    if use_jit is None:
+        use_jit = NUMBA_AVAILABLE
+    kernel = _jit_kernel() if use_jit else _apply_rules_numpy
+
+    return kernel(
+        np.asarray(purchases, dtype=np.int64),
+        np.asarray(referral_flags, dtype=np.int64),
+        np.asarray(base_points, dtype=np.float64),
+        np.asarray(starting_points, dtype=np.float64),
+        np.asarray(rules.milestone_thresholds, dtype=np.float64),
+        np.asarray(rules.milestone_values, dtype=np.float64),
+        int(rules.referral_cap),
+        float(rules.points_per_referral),
+        float(rules.wheel_points),
+        float(rules.cash_out_threshold),
+    )
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class BehaviourParams:
+    """Inputs that shape the simulated customer population."""
+
+    num_customers: int
+    average_purchases_per_customer: int = 12
+    average_order_value: float = 25
+    rockbox_share: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SchemeParams:
+    """Rules of a loyalty scheme, applied to an already sampled population."""
+
+    profit_margin: float = 2.0  # percent
+    points_to_value_ratio: float = 0.001
+
+    points_per_referral: int = 1500
+    max_referrals: int = 5
+    point_per_spend: int = 2
+    points_per_request: int = 1
+    points_per_upvote: int = 10
+
+    milestone1: int = 5
+    milestone2: int = 10
+    milestone3: int = 25
+    milestone1_value: int = 500
+    milestone2_value: int = 1000
+    milestone3_value: int = 2500
+
+    spin_the_wheel_points: int = 2500
+    avg_cost_spw: float = 0.50
+
+    assign_users_starting_points: bool = False
+    cash_out_threshold: int = 10000
@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from functools import lru_cache
+
+import numpy as np
+
+from simulation.params import BehaviourParams
+from simulation.profiling import stage
+
+# Customers are sampled in fixed-size blocks, each with its own child stream of the
+# run's seed. The block size must not depend on how the work is split, otherwise the
+# same seed would give different customers when run chunked or in parallel.
+BLOCK_SIZE = 50_000
+
+# Behaviour model constants, shared with the analytic estimator
+PURCHASE_SUCCESS_PROBABILITY = 0.5
+ORDER_VALUE_SD = 15
+MIN_ORDER_VALUE = 5
+REQUESTS_LOGNORMAL = (2, 1.2)  # mean, sigma
+UPVOTES_LOGNORMAL = (1, 0.4)
+ACTIVE_PROBABILITY = 0.5  # chance a customer makes requests / a request gets upvotes
+REFERRAL_INVGAUSS = (3 / 2, 2)  # mu, scale
+REFERRAL_OFFSET = 7
+ZERO_START_PROBABILITY = 0.4
+STARTING_POINTS_MEAN = 3000
+STARTING_POINTS_SD = 3000
+STARTING_POINTS_CASH_OUT = 10000
+
+
+@lru_cache(maxsize=None)
+def referral_distribution():
+    """Frozen invgauss used for referral counts; scipy is only imported on first use."""
+    import scipy.stats as stats
+
+    mu, scale = REFERRAL_INVGAUSS
+    return stats.invgauss(mu=mu, scale=scale)
+
+
+@dataclass(frozen=True)
+class Population:
+    """Per-customer behaviour arrays, independent of any scheme rules.
+
+    Treat the arrays as read-only: a population is shared between reruns and scenarios.
+    """
+
+    purchases: np.ndarray
+    order_values: np.ndarray
+    total_spend: np.ndarray
+    requests: np.ndarray
+    upvotes: np.ndarray
+    referral_flags: np.ndarray
+    rockbox_referral: np.ndarray
+    starting_points: np.ndarray
+    order_retailer_draws: np.ndarray
+
+    @property
+    def num_customers(self):
+        return len(self.purchases)
+
+
+def per_customer_sum(counts, values):
+    # Sum a flat array of events back onto the customers that generated them
+    owners = np.repeat(np.arange(len(counts)), counts)
+    return np.bincount(owners, weights=values, minlength=len(counts))
+
+
+def _concat(blocks):
+    return Population(**{
+        field.name: np.concatenate([getattr(block, field.name) for block in blocks])
+        for field in fields(Population)
+    })
+
+
+def block_seeds(behaviour: BehaviourParams):
+    """One child SeedSequence per block of customers, derived from the behaviour seed."""
+    num_blocks = max(1, -(-behaviour.num_customers // BLOCK_SIZE))
+    return np.random.SeedSequence(behaviour.seed).spawn(num_blocks)
+
+
+def _sample_block(behaviour: BehaviourParams, block: int, seed_seq: np.random.SeedSequence) -> Population:
+    rng = np.random.Generator(np.random.PCG64(seed_seq))
+    num_customers = min(BLOCK_SIZE, behaviour.num_customers - block * BLOCK_SIZE)
+
+    purchases = rng.negative_binomial(n=behaviour.average_purchases_per_customer, p=PURCHASE_SUCCESS_PROBABILITY, size=num_customers)
+    order_values = rng.normal(loc=behaviour.average_order_value, scale=ORDER_VALUE_SD, size=purchases.sum())
+    order_values = np.maximum(order_values, MIN_ORDER_VALUE)  # Min purchase of £5
+
+    requests = rng.lognormal(*REQUESTS_LOGNORMAL, size=num_customers).astype(int)
+    # Introduce a 50% chance of being zero
+    requests = requests * rng.choice([0, 1], size=num_customers, p=[1 - ACTIVE_PROBABILITY, ACTIVE_PROBABILITY])
+
+    upvotes = rng.lognormal(*UPVOTES_LOGNORMAL, size=requests.sum()).astype(int) - 1
+    upvotes = np.maximum(upvotes, 0)
+    upvotes = upvotes * rng.choice([0, 1], size=len(upvotes), p=[1 - ACTIVE_PROBABILITY, ACTIVE_PROBABILITY])  # 50% chance for zero
+
+    referral_flags = np.round(referral_distribution().rvs(size=num_customers, random_state=rng)).astype(int) - REFERRAL_OFFSET
+
+    rockbox_referral = rng.random(size=num_customers) < behaviour.rockbox_share
+
+    # Starting balances: 40% start on zero, the rest are cashed out down to below 10,000
+    starting_points = rng.normal(loc=STARTING_POINTS_MEAN, scale=STARTING_POINTS_SD, size=num_customers)
+    starting_points[rng.random(size=num_customers) < ZERO_START_PROBABILITY] = 0
+    starting_points = np.maximum(starting_points, 0)
+    starting_points = np.where(starting_points > STARTING_POINTS_CASH_OUT, starting_points % STARTING_POINTS_CASH_OUT, starting_points)
+
+    # Uniform draw per order, mapped onto a retailer by whichever economics table is in use
+    order_retailer_draws = rng.random(size=len(order_values))
+
+    return Population(
+        purchases=purchases,
+        order_values=order_values,
+        total_spend=per_customer_sum(purchases, order_values),
+        requests=requests,
+        upvotes=per_customer_sum(requests, upvotes).astype(int),
+        referral_flags=referral_flags,
+        rockbox_referral=rockbox_referral,
+        starting_points=starting_points,
+        order_retailer_draws=order_retailer_draws,
+    )
+
+
+def sample_population(behaviour: BehaviourParams, workers: int = 1) -> Population:
+    """Sample the customer population, optionally spreading the blocks over worker processes.
+
+    The result only depends on the behaviour inputs and seed, not on ``workers``.
+    """
+    seeds = block_seeds(behaviour)
+    blocks = range(len(seeds))
+
+    with stage("Sample population"):
+        if workers > 1 and len(seeds) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(seeds))) as pool:
+                return _concat(list(pool.map(_sample_block, [behaviour] * len(seeds), blocks, seeds)))
+
+        return _concat([_sample_block(behaviour, block, seed_seq) for block, seed_seq in zip(blocks, seeds)])
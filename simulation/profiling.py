@@ -0,0 +1,134 @@
+"""Per-stage timing, peak memory and optional cProfile capture for a simulation run.
+
+Code marks its stages with ``with stage("name"):``. Outside an active StageProfiler
+these are no-ops, so the simulation core can be instrumented without slowing it down.
+
+tracemalloc is process-wide: tracing stays on while any profiler needs it, but the peaks
+are shared, so per-stage peak memory is only exact when one run at a time is traced.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+
+_active_profiler = ContextVar("active_profiler", default=None)
+
+# Profilers that need tracemalloc, e.g. from concurrent dashboard sessions
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_owns_tracemalloc = False
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _owns_tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _owns_tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        # Tracing started by someone else (e.g. python -X tracemalloc) is left running
+        if _tracemalloc_users == 0 and _owns_tracemalloc:
+            tracemalloc.stop()
+            _owns_tracemalloc = False
+
+
+class StageProfiler:
+    """Collects stage timings for one run; repeated stages are aggregated by name."""
+
+    def __init__(self, trace_memory=False, cprofile=False):
+        self.trace_memory = trace_memory
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.stages = {}
+        self.total_seconds = 0.0
+        self._stack = []
+        self._started = None
+        self._token = None
+        self._tracing = False
+
+    def start(self):
+        self._token = _active_profiler.set(self)
+        if self.trace_memory:
+            _acquire_tracemalloc()
+            self._tracing = True
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.total_seconds = time.perf_counter() - self._started
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self._tracing:
+            _release_tracemalloc()
+            self._tracing = False
+        _active_profiler.reset(self._token)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            # Resetting the peak would lose the enclosing stage's peak so far, so carry it up
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = [name, 0]
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self._stack.pop()
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1]) if self.trace_memory else None
+            if peak is not None and self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self._record(name, seconds, peak)
+
+    def _record(self, name, seconds, peak):
+        entry = self.stages.setdefault(name, {"stage": name, "calls": 0, "seconds": 0.0, "peak_memory_mb": None})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        if peak is not None:
+            entry["peak_memory_mb"] = max(entry["peak_memory_mb"] or 0.0, peak / 2**20)
+
+    def cprofile_stats(self, limit=30):
+        if self.cprofile is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(self.cprofile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def report(self):
+        return {
+            "total_seconds": self.total_seconds,
+            "stages": list(self.stages.values()),
+            "cprofile": self.cprofile_stats(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
+
+
+def stage(name):
+    """Time ``name`` under the active profiler, if there is one."""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from simulation.economics import RetailerEconomics
+from simulation.kernels import RuleSet, apply_rules
+from simulation.params import SchemeParams
+from simulation.population import Population, per_customer_sum
+from simulation.profiling import stage
+
+ROCKBOX_CUT = 0.25  # share of revenue from Rockbox-referred customers paid to Rockbox
+
+CUSTOMER_COLUMNS = [
+    "Customer_ID", "Purchases", "Rockbox_Referral", "Total_Spend", "Purchase_Points",
+    "Milestone_Points", "Number_Referrals", "Referral_Points", "Number_Requests", "Request_Points",
+    "Number_Upvotes", "Upvote_Points", "Number_Spin_The_Wheels", "Spin_The_Wheel_Value",
+    "Starting_Points", "Total_Points", "Total_Points_Claimed", "Total_Points_Claimed_Value",
+    "Revenue", "Rockbox Cut", "Individual_Profit",
+]
+
+
+def scheme_columns(population: Population, scheme: SchemeParams, economics: RetailerEconomics = None) -> dict:
+    """Apply the scheme rules to every customer at once and return the result columns as arrays.
+
+    Without ``economics`` revenue is the scheme's single profit margin on all spend; with it,
+    each purchase earns the margin of the retailer it was made at.
+    """
+    with stage("Scheme rules"):
+        purchases = population.purchases
+
+        # Calculate points from purchases
+        purchase_points = population.total_spend * scheme.point_per_spend
+
+        request_points = population.requests * scheme.points_per_request
+        upvote_points = population.upvotes * scheme.points_per_upvote
+
+        if scheme.assign_users_starting_points:
+            starting_points = population.starting_points
+        else:
+            starting_points = np.zeros(population.num_customers)
+
+        # Milestones, referrals, spin the wheel and cash-outs run through the rule kernel
+        (
+            milestone_points, num_referrals, referral_points, num_stw, total_points, total_points_claimed,
+        ) = apply_rules(
+            RuleSet.from_scheme(scheme),
+            purchases,
+            population.referral_flags,
+            purchase_points + request_points + upvote_points,
+            starting_points,
+        )
+        stw_value = np.floor(num_stw) * scheme.avg_cost_spw
+
+        if economics is None:
+            revenue = population.total_spend * scheme.profit_margin / 100
+        else:
+            rates = economics.revenue_rates(scheme.profit_margin)
+            order_rates = rates[economics.assign(population.order_retailer_draws)]
+            revenue = per_customer_sum(purchases, population.order_values * order_rates)
+
+        # Calculate profit per customer
+        claimed_value = total_points_claimed * scheme.points_to_value_ratio
+        rockbox_cut = np.where(population.rockbox_referral, revenue * ROCKBOX_CUT, 0)
+
+        return {
+            "Customer_ID": np.arange(1, population.num_customers + 1),
+            "Purchases": purchases,
+            "Rockbox_Referral": population.rockbox_referral,
+            "Total_Spend": population.total_spend,
+            "Purchase_Points": purchase_points,
+            "Milestone_Points": milestone_points,
+            "Number_Referrals": num_referrals,
+            "Referral_Points": referral_points,
+            "Number_Requests": population.requests,
+            "Request_Points": request_points,
+            "Number_Upvotes": population.upvotes,
+            "Upvote_Points": upvote_points,
+            "Number_Spin_The_Wheels": num_stw,
+            "Spin_The_Wheel_Value": stw_value,
+            "Starting_Points": starting_points,
+            "Total_Points": total_points,
+            "Total_Points_Claimed": total_points_claimed,
+            "Total_Points_Claimed_Value": claimed_value,
+            "Revenue": revenue,
+            "Rockbox Cut": rockbox_cut,
+            "Individual_Profit": revenue - claimed_value - rockbox_cut - stw_value,
+        }
+
+
+def evaluate_scheme(population: Population, scheme: SchemeParams, economics: RetailerEconomics = None) -> pd.DataFrame:
+    """Apply the scheme rules to every customer at once and return the per-customer table."""
+    columns = scheme_columns(population, scheme, economics)
+
+    with stage("Customer DataFrame"):
+        df_customers = pd.DataFrame(columns, columns=CUSTOMER_COLUMNS)
+
+    # Round values
+    with stage("Round"):
+        return df_customers.round(2)
+
+
+def scheme_totals(population: Population, scheme: SchemeParams, economics: RetailerEconomics = None) -> pd.DataFrame:
+    """Column totals of evaluate_scheme() as a one-row table, without building the per-customer one.
+
+    summary_metrics() and bonus_split() only sum columns, so they accept either table.
+    """
+    columns = scheme_columns(population, scheme, economics)
+
+    with stage("Column totals"):
+        # Round per customer first, so the totals match those of the evaluate_scheme() table
+        return pd.DataFrame({
+            name: [np.round(values, 2).sum() if values.dtype.kind == "f" else values.sum()]
+            for name, values in columns.items()
+        })
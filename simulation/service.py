@@ -0,0 +1,253 @@
+"""Local HTTP/JSON service for running scenarios outside the dashboard.
+
+    python -m simulation.service --port 8600 --workers 4
+
+POST /scenarios with {"behaviour": {...}, "scheme": {...}} (fields of BehaviourParams
+and SchemeParams, plus an optional "retailer_economics": true to use the Ecom Modelling
+workbooks for revenue) queues a run and returns its job id. GET /scenarios/<job_id> returns
+the status and, once finished, the summary metrics and a link to the per-customer CSV.
+Identical requests share a job, so repeated requests only rerun a simulation that failed.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, fields
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from simulation.economics import load_retailer_economics
+from simulation.params import BehaviourParams, SchemeParams
+from simulation.population import sample_population
+from simulation.scheme import evaluate_scheme
+from simulation.summary import summary_metrics
+
+# Keep a single request well inside a worker's memory: a worker killed mid-run breaks the pool
+MAX_CUSTOMERS = 2_000_000
+MAX_ORDERS = 40_000_000
+POSITIVE_FIELDS = {"num_customers", "average_purchases_per_customer", "spin_the_wheel_points", "cash_out_threshold"}
+
+
+def _check_params(params):
+    for field in fields(params):
+        value = getattr(params, field.name)
+        if field.type is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{field.name} must be true or false")
+            continue
+        if value is None and field.name == "seed":
+            continue
+        # bool is an int subclass, but true/false is not a count
+        number_types = (int, float) if field.type is float else int
+        if isinstance(value, bool) or not isinstance(value, number_types) or not math.isfinite(value) or value < 0:
+            kind = "number" if field.type is float else "integer"
+            raise ValueError(f"{field.name} must be a non-negative {kind}")
+        if field.name in POSITIVE_FIELDS and value == 0:
+            raise ValueError(f"{field.name} must be greater than zero")
+
+
+def parse_scenario(payload):
+    """Build the parameter objects from a request body, raising ValueError on bad input."""
+    if not isinstance(payload, dict):
+        raise ValueError("request body must be a JSON object")
+    if not all(isinstance(payload.get(name, {}), dict) for name in ("behaviour", "scheme")):
+        raise ValueError("behaviour and scheme must be JSON objects")
+    try:
+        behaviour = BehaviourParams(**payload.get("behaviour", {}))
+        scheme = SchemeParams(**payload.get("scheme", {}))
+    except TypeError as exc:
+        raise ValueError(str(exc)) from exc
+
+    _check_params(behaviour)
+    _check_params(scheme)
+    if behaviour.rockbox_share > 1:
+        raise ValueError("rockbox_share must be between 0 and 1")
+    if behaviour.num_customers > MAX_CUSTOMERS:
+        raise ValueError(f"num_customers must be at most {MAX_CUSTOMERS:,}")
+    # Purchases per customer average average_purchases_per_customer, so this bounds the order arrays
+    if behaviour.num_customers * behaviour.average_purchases_per_customer > MAX_ORDERS:
+        raise ValueError(f"num_customers * average_purchases_per_customer must be at most {MAX_ORDERS:,}")
+    retailer_economics = payload.get("retailer_economics", False)
+    if not isinstance(retailer_economics, bool):
+        raise ValueError("retailer_economics must be true or false")
+    return behaviour, scheme, retailer_economics
+
+
+def scenario_key(behaviour: BehaviourParams, scheme: SchemeParams, retailer_economics: bool) -> str:
+    canonical = json.dumps({
+        "behaviour": asdict(behaviour),
+        "scheme": asdict(scheme),
+        "retailer_economics": retailer_economics,
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def run_scenario(behaviour: BehaviourParams, scheme: SchemeParams, retailer_economics: bool, customers_path: str) -> dict:
+    """Worker entry point: simulate, write the per-customer table and return the summary."""
+    economics = load_retailer_economics() if retailer_economics else None
+    df_customers = evaluate_scheme(sample_population(behaviour), scheme, economics)
+    df_customers.to_csv(customers_path, index=False)
+
+    summary = summary_metrics(df_customers, scheme.points_to_value_ratio)
+    # JSON has no NaN or infinity, and numpy scalars are not serialisable
+    return {name: float(value) if math.isfinite(value) else None for name, value in summary.items()}
+
+
+def _failed(future):
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+class ScenarioQueue:
+    """Deduplicating front of a worker pool; finished results are kept in an LRU cache."""
+
+    def __init__(self, workers, results_dir, max_results=64):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.results_dir = results_dir
+        self.max_results = max_results
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def customers_path(self, job_id):
+        return os.path.join(self.results_dir, f"{job_id}.csv")
+
+    def submit(self, behaviour, scheme, retailer_economics=False):
+        job_id = scenario_key(behaviour, scheme, retailer_economics)
+        with self.lock:
+            # A failed run is not cached: submitting the same scenario again retries it
+            if job_id not in self.jobs or _failed(self.jobs[job_id]):
+                self.jobs[job_id] = self._run(behaviour, scheme, retailer_economics, self.customers_path(job_id))
+            self.jobs.move_to_end(job_id)
+            self._evict()
+        return job_id
+
+    def _run(self, *args):
+        try:
+            return self.pool.submit(run_scenario, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for running out of memory), which leaves the pool
+            # unusable; its queued jobs have already failed, so replace it and carry on
+            self.pool.shutdown(wait=False)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.pool.submit(run_scenario, *args)
+
+    def _evict(self):
+        while len(self.jobs) > self.max_results:
+            job_id, future = next(iter(self.jobs.items()))
+            if not future.done():
+                break
+            del self.jobs[job_id]
+            if os.path.exists(self.customers_path(job_id)):
+                os.remove(self.customers_path(job_id))
+
+    def status(self, job_id):
+        with self.lock:
+            future = self.jobs.get(job_id)
+        if future is None:
+            return None
+        if not future.done():
+            return {"job_id": job_id, "status": "running" if future.running() else "queued"}
+        if _failed(future):
+            error = "cancelled" if future.cancelled() else str(future.exception())
+            return {"job_id": job_id, "status": "failed", "error": error}
+        return {
+            "job_id": job_id,
+            "status": "done",
+            "summary": future.result(),
+            "customers_url": f"/scenarios/{job_id}/customers.csv",
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class ScenarioHandler(BaseHTTPRequestHandler):
+    server_version = "LoyaltyScenarioService/1.0"
+
+    @property
+    def queue(self) -> ScenarioQueue:
+        return self.server.queue
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, allow_nan=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/scenarios":
+            return self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            behaviour, scheme, retailer_economics = parse_scenario(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as exc:
+            return self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+
+        job = self.queue.status(self.queue.submit(behaviour, scheme, retailer_economics))
+        self._send_json(HTTPStatus.OK if job["status"] == "done" else HTTPStatus.ACCEPTED, job)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "scenarios":
+            return self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+        job = self.queue.status(parts[1])
+        if job is None:
+            return self._send_json(HTTPStatus.NOT_FOUND, {"error": "unknown job"})
+
+        if len(parts) == 2:
+            return self._send_json(HTTPStatus.OK, job)
+
+        if parts[2:] == ["customers.csv"] and job["status"] == "done":
+            # The job can be evicted, and its file deleted, once status() has returned; an
+            # open file stays readable after deletion, so take the size from the open file
+            try:
+                customers = open(self.queue.customers_path(parts[1]), "rb")
+            except FileNotFoundError:
+                return self._send_json(HTTPStatus.NOT_FOUND, {"error": "result expired"})
+            with customers:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(os.fstat(customers.fileno()).st_size))
+                self.end_headers()
+                shutil.copyfileobj(customers, self.wfile)
+            return
+
+        self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--results-dir", default=None, help="where per-customer CSVs are written (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    results_dir = args.results_dir or tempfile.mkdtemp(prefix="loyalty-scenarios-")
+    os.makedirs(results_dir, exist_ok=True)
+
+    server = ThreadingHTTPServer((args.host, args.port), ScenarioHandler)
+    server.queue = ScenarioQueue(args.workers, results_dir)
+    print(f"Serving scenarios on http://{args.host}:{args.port} with {args.workers} workers, results in {results_dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import pandas as pd
+
+
+def summary_metrics(df_customers: pd.DataFrame, points_to_value_ratio: float) -> dict:
+    """Headline totals shown on the Summary tab."""
+    total_points = df_customers.Total_Points.sum()
+    claimed_value = df_customers.Total_Points_Claimed_Value.sum()
+    stw_value = df_customers.Spin_The_Wheel_Value.sum()
+    number_referrals = df_customers.Number_Referrals.sum()
+    rockbox_cut = df_customers["Rockbox Cut"].sum()
+    rockbox_referrals = df_customers.Rockbox_Referral.sum()
+
+    return {
+        "Total_Spend": df_customers.Total_Spend.sum(),
+        "Revenue": df_customers.Revenue.sum(),
+        "Profit": df_customers.Individual_Profit.sum(),
+        "Total_Points": total_points,
+        "Total_Points_Value": total_points * points_to_value_ratio,
+        "Total_Points_Claimed_Value": claimed_value,
+        "Spin_The_Wheel_Value": stw_value,
+        "Number_Referrals": number_referrals,
+        "Cost_Per_Acquisition": (claimed_value + stw_value) / number_referrals if number_referrals else float("nan"),
+        "Rockbox_Cut": rockbox_cut,
+        "Rockbox_Referrals": rockbox_referrals,
+        "Rockbox_Cost_Per_Acquisition": rockbox_cut / rockbox_referrals if rockbox_referrals else float("nan"),
+    }
+
+
+def bonus_split(df_customers: pd.DataFrame, points_to_value_ratio: float) -> pd.DataFrame:
+    """Points giveaway broken down by where the points came from."""
+    points_breakdown = pd.DataFrame({
+        'Points From': ['Purchases', 'Milestones', 'Referrals', 'Requests', 'Upvotes'],
+        'Points': [
+            df_customers.Purchase_Points.sum(),
+            df_customers.Milestone_Points.sum(),
+            df_customers.Referral_Points.sum(),
+            df_customers.Request_Points.sum(),
+            df_customers.Upvote_Points.sum(),
+        ],
+    })
+    total_points_giveaway = points_breakdown['Points'].sum()
+
+    # Calculate the value and percentage of points giveaway
+    points_breakdown['Value (£)'] = points_breakdown['Points'] * points_to_value_ratio
+    points_breakdown['Percentage of Points Giveaway'] = (100 * points_breakdown['Points'] / total_points_giveaway).apply(lambda x: f"{x:.1f}%")
+
+    return points_breakdown.round(2).sort_values('Points', ascending=False).reset_index(drop=True)